@@ -4,154 +4,585 @@ Analyze all captured messages to create a comprehensive inventory.
 This will help us understand what message types we're actually seeing.
 """
 
-import json
-import glob
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import pickle
+import re
+import sys
+from binascii import unhexlify
 from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
-def main():
-    # Collect all messages
-    all_messages = []
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; the stdlib parser accepts bytes lines too
+    import json as orjson
 
-    files = sorted(glob.glob('smartap-server/analysis/messages/capture-*.jsonl'))
-    print(f"Analyzing {len(files)} capture files...\n")
+# Fast path for the fields we use. Capture records are written by the Go
+# server (MessageAnalysis in internal/server/websocket.go), so the key
+# order is fixed: payload_hex directly follows payload_length, and
+# message_num comes earlier on the same line. Starting the pattern with a
+# literal lets the regex engine skip straight to each record's payload.
+# Whitespace is matched with [ \t]* rather than \s* so no match can span
+# a newline; _iter_records relies on that for its line accounting.
+_RECORD_RE = re.compile(
+    rb'"payload_length":[ \t]*(\d+),[ \t]*"payload_hex":[ \t]*"([0-9a-f]*)"'
+)
+_MSG_NUM_RE = re.compile(rb'"message_num":[ \t]*(\d+)')
+_MESSAGES_DIR = 'smartap-server/analysis/messages'
+_BANNER = '=' * 80
+# How many 77-byte message numbers to keep for the report
+_MSG_NUM_SAMPLE = 16
+# --approx: a length above _APPROX_MIN_LENGTH (other than 77) is counted
+# exactly until it has more than _APPROX_EXACT_LIMIT unique patterns, then
+# its patterns move into a Bloom filter. Each filter layer keeps false
+# positives near its own error rate (the first at _BLOOM_ERROR_RATE / 2);
+# layers merged in from other files are kept side by side rather than
+# overfilled. The unique count comes from a HyperLogLog sketch with
+# 2**_HLL_PRECISION registers (~0.8% standard error), which merges exactly.
+_APPROX_MIN_LENGTH = 64
+_APPROX_EXACT_LIMIT = 4096
+_BLOOM_ERROR_RATE = 0.001
+_HLL_PRECISION = 14
+# Per-file ingest results are cached here between runs; bump the version
+# whenever _Inventory or the ingest rules change.
+_CACHE_DIR = '.analyze_cache'
+_CACHE_VERSION = 3
+
+
+def _capture_files(directory):
+    """Return the sorted capture-*.jsonl paths in directory (one readdir, no fnmatch)."""
+    try:
+        with os.scandir(directory) as it:
+            paths = [e.path for e in it
+                     if e.name.startswith('capture-') and e.name.endswith('.jsonl')]
+    except FileNotFoundError:
+        return []
+    paths.sort()
+    return paths
+
+
+def _decode_lines(chunk):
+    """Yield (message_num, payload_length, payload_hex) by JSON-decoding each line of chunk."""
+    for line in chunk.split(b'\n'):
+        if not line.strip():
+            continue
+        msg = orjson.loads(line)
+        yield msg.get('message_num'), msg['payload_length'], msg['payload_hex']
+
+
+def _iter_records(filepath, msg_num_lengths=()):
+    """Yield (message_num, payload_length, payload_hex) for each record in filepath.
+
+    The file is mapped read-only and _RECORD_RE scans the whole mapping in
+    one finditer pass, so line splitting and field extraction stay in C.
+    message_num is only looked up for payload lengths in msg_num_lengths
+    (None otherwise). Lines the regex does not match are handed to the
+    JSON parser.
+    """
+    with open(filepath, 'rb') as f:
+        # mmap refuses zero-length files
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Ask the kernel to start reading the whole file ahead of the
+            # scan so disk I/O overlaps with parsing (POSIX only).
+            for advice in ('MADV_WILLNEED', 'MADV_SEQUENTIAL'):
+                if hasattr(mmap, advice):
+                    mm.madvise(getattr(mmap, advice))
+            size = len(mm)
+            rfind = mm.rfind
+            find = mm.find
+            pos = 0  # start of the first line not yet accounted for
+            for m in _RECORD_RE.finditer(mm):
+                # The pattern cannot span a newline, so each match lies
+                # within one line; lines between pos and that line's start
+                # are ones the fast path skipped.
+                start = m.start()
+                line_start = rfind(b'\n', pos, start) + 1 or pos
+                if line_start > pos:
+                    yield from _decode_lines(mm[pos:line_start])
+                length = int(m.group(1))
+                msg_num = None
+                if length in msg_num_lengths:
+                    n = _MSG_NUM_RE.search(mm, line_start, start)
+                    if n is not None:
+                        msg_num = int(n.group(1))
+                yield msg_num, length, m.group(2)
+                end = find(b'\n', m.end())
+                pos = size if end < 0 else end + 1
+            if pos < size:
+                yield from _decode_lines(mm[pos:])
+
+
+def _hash_pair(key):
+    """Return the two 64-bit hashes used for double hashing key."""
+    digest = hashlib.blake2b(key, digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class _BloomFilter:
+    """Bloom filter sized for capacity keys at error_rate; equal-sized filters merge by OR."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_hashes = max(1, math.ceil(-math.log2(error_rate)))
+        num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.num_bits = (num_bits + 7) // 8 * 8
+        self.bits = bytearray(self.num_bits // 8)
+        self.added = 0
+
+    def _positions(self, h1, h2):
+        num_bits = self.num_bits
+        return [(h1 + i * h2) % num_bits for i in range(self.num_hashes)]
+
+    def contains(self, h1, h2):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(h1, h2))
+
+    def add(self, h1, h2):
+        bits = self.bits
+        for pos in self._positions(h1, h2):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.added += 1
+
+    def absorb(self, other):
+        """OR other into self if they are the same size and the result stays
+        within capacity; return whether it was merged."""
+        if other.num_bits != self.num_bits or other.num_hashes != self.num_hashes:
+            return False
+        merged = int.from_bytes(self.bits, 'little') | int.from_bytes(other.bits, 'little')
+        added = self._estimate(bin(merged).count('1'))
+        if added > self.capacity:
+            return False
+        self.bits = bytearray(merged.to_bytes(len(self.bits), 'little'))
+        self.added = added
+        return True
+
+    def _estimate(self, set_bits):
+        """Estimate the number of distinct keys behind set_bits set bits."""
+        set_bits = min(set_bits, self.num_bits - 1)
+        return round(-self.num_bits / self.num_hashes
+                     * math.log(1 - set_bits / self.num_bits))
+
+
+class _HyperLogLog:
+    """HyperLogLog distinct-count sketch over 64-bit hashes; merges exactly by register max."""
+
+    def __init__(self, precision=_HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, h):
+        width = 64 - self.precision
+        idx = h >> width
+        rank = width - (h & ((1 << width) - 1)).bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def update(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self):
+        registers = self.registers
+        m = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in registers)
+        zeros = registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class _ScalableBloomFilter:
+    """Bloom filter over bytes keys that grows by appending larger layers.
+
+    A new layer holds twice as many keys as the largest existing one at
+    half its error rate. Merging ORs each of other's layers into a matching
+    layer only while the result stays within capacity, and otherwise keeps
+    it as an extra layer, so no layer is ever filled past its sizing. The
+    distinct-key count is tracked separately in a HyperLogLog sketch.
+    """
+
+    def __init__(self):
+        self.layers = []
+        self.sketch = _HyperLogLog()
+
+    def add(self, key):
+        h1, h2 = _hash_pair(key)
+        self.sketch.add(h1)
+        layers = self.layers
+        for layer in layers:
+            if layer.contains(h1, h2):
+                return
+        if not layers or layers[-1].added >= layers[-1].capacity:
+            if layers:
+                top = max(layers, key=lambda layer: layer.capacity)
+                layer = _BloomFilter(2 * top.capacity, top.error_rate / 2)
+            else:
+                layer = _BloomFilter(4 * _APPROX_EXACT_LIMIT, _BLOOM_ERROR_RATE / 2)
+            layers.append(layer)
+        layers[-1].add(h1, h2)
+
+    def update(self, other):
+        self.sketch.update(other.sketch)
+        for layer in other.layers:
+            if not any(mine.absorb(layer) for mine in self.layers):
+                self.layers.append(layer)
+
+    def estimate_count(self):
+        """Estimate the number of distinct keys added (from the HyperLogLog sketch)."""
+        return self.sketch.estimate()
+
+
+class _Inventory:
+    """Aggregates for one or more capture files; partials merge by addition."""
+
+    def __init__(self, approx=False):
+        self.approx = approx
+        self.patterns_by_length = defaultdict(Counter)
+        self.envelope_by_length = Counter()
+        self.envelope_first_payload = {}
+        self.msg_nums_77 = []
+        self.all_first_77 = True
+        # --approx buckets that outgrew exact counting: per-length totals,
+        # first bytes and Bloom filters
+        self.approx_counts = Counter()
+        self.approx_first_bytes = defaultdict(Counter)
+        self.approx_patterns = {}
+
+    def over_limit(self, length, patterns):
+        """Whether the exact bucket patterns for length should move to a Bloom filter."""
+        return (self.approx and len(patterns) > _APPROX_EXACT_LIMIT
+                and length > _APPROX_MIN_LENGTH and length != 77)
+
+    def _add_to_filter(self, length, patterns):
+        bloom = self.approx_patterns[length]
+        first_bytes = self.approx_first_bytes[length]
+        for pattern, count in patterns.items():
+            bloom.add(pattern)
+            if pattern:
+                first_bytes[pattern[0]] += count
+        self.approx_counts[length] += sum(patterns.values())
 
-    for filepath in files:
+    def compress(self, length):
+        """Move the exact bucket for length into a new Bloom filter."""
+        patterns = self.patterns_by_length.pop(length)
+        self.approx_patterns[length] = _ScalableBloomFilter()
+        self._add_to_filter(length, patterns)
+        return self.approx_patterns[length]
+
+    def merge(self, other):
+        """Fold other into self; other must come from a later file."""
+        for length, patterns in other.patterns_by_length.items():
+            if length in self.approx_patterns:
+                self._add_to_filter(length, patterns)
+                continue
+            mine = self.patterns_by_length[length]
+            mine.update(patterns)
+            if self.over_limit(length, mine):
+                self.compress(length)
+        for length, bloom in other.approx_patterns.items():
+            if length in self.patterns_by_length:
+                self.compress(length)
+            if length in self.approx_patterns:
+                self.approx_patterns[length].update(bloom)
+            else:
+                self.approx_patterns[length] = bloom
+        self.approx_counts.update(other.approx_counts)
+        for length, first_bytes in other.approx_first_bytes.items():
+            self.approx_first_bytes[length].update(first_bytes)
+        self.envelope_by_length.update(other.envelope_by_length)
+        for length, payload in other.envelope_first_payload.items():
+            self.envelope_first_payload.setdefault(length, payload)
+        self.msg_nums_77 = (self.msg_nums_77 + other.msg_nums_77)[:_MSG_NUM_SAMPLE]
+        self.all_first_77 = self.all_first_77 and other.all_first_77
+
+
+def _scan_file(filepath, approx=False):
+    """Stream one capture file into an _Inventory.
+
+    Returns (inventory, error); on a read error the inventory holds
+    whatever was collected before the failure.
+    """
+    inv = _Inventory(approx)
+    patterns_by_length = inv.patterns_by_length
+    approx_patterns = inv.approx_patterns
+
+    try:
+        for msg_num, length, hex_data in _iter_records(filepath, (77,)):
+            # Key patterns by their packed bytes: half the size of the
+            # hex string and cheaper to hash. unhexlify takes the regex's
+            # bytes match as-is, so there is no ASCII decode step.
+            payload_bytes = unhexlify(hex_data)
+            bloom = approx_patterns.get(length)
+            if bloom is None:
+                patterns = patterns_by_length[length]
+                patterns[payload_bytes] += 1
+                if approx and inv.over_limit(length, patterns):
+                    inv.compress(length)
+            else:
+                bloom.add(payload_bytes)
+                inv.approx_counts[length] += 1
+                if payload_bytes:
+                    inv.approx_first_bytes[length][payload_bytes[0]] += 1
+
+            if length == 77:
+                if len(inv.msg_nums_77) < _MSG_NUM_SAMPLE:
+                    inv.msg_nums_77.append(msg_num)
+                if msg_num != 1:
+                    inv.all_first_77 = False
+
+            # Envelope: at least 10 bytes, starts with 7e 03 (sync +
+            # version) and has 0x01 at payload offset 0 (byte 8)
+            if (len(payload_bytes) >= 10 and payload_bytes[0] == 0x7e
+                    and payload_bytes[1] == 0x03 and payload_bytes[8] == 0x01):
+                inv.envelope_by_length[length] += 1
+                inv.envelope_first_payload.setdefault(length, payload_bytes)
+    except Exception as e:
+        return inv, str(e)
+    return inv, None
+
+
+def _cache_path(filepath, approx):
+    # Exact and --approx results are cached side by side
+    key = hashlib.sha1(f"{os.path.abspath(filepath)}\0{approx}".encode()).hexdigest()
+    return os.path.join(_CACHE_DIR, key + '.pkl')
+
+
+def _load_cached(filepath, st, approx):
+    """Return the cached _Inventory for filepath if it is still current, else None."""
+    try:
+        with open(_cache_path(filepath, approx), 'rb') as f:
+            version, mtime_ns, size, cached_approx, inv = pickle.load(f)
+    except Exception:
+        return None
+    if (version, mtime_ns, size, cached_approx) != (
+            _CACHE_VERSION, st.st_mtime_ns, st.st_size, approx):
+        return None
+    return inv
+
+
+def _store_cached(filepath, st, approx, inv):
+    path = _cache_path(filepath, approx)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        with open(tmp, 'wb') as f:
+            pickle.dump((_CACHE_VERSION, st.st_mtime_ns, st.st_size, approx, inv),
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError:
+        # The cache is best-effort; a failed write just means a rescan
+        pass
+
+
+def _ingest_file(filepath, approx=False, use_cache=True):
+    """Like _scan_file, but reuses the cached result while the file is unchanged.
+
+    The file is stat'ed before scanning, so a capture that grows while it is
+    read is cached under its old size and rescanned on the next run.
+
+    The cache is an unauthenticated pickle loaded from _CACHE_DIR in the
+    current working directory; anyone who can write there can run code in
+    this tool. Only use it in a trusted checkout, or pass --no-cache.
+    """
+    if not use_cache:
+        return _scan_file(filepath, approx)
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return _scan_file(filepath, approx)
+    inv = _load_cached(filepath, st, approx)
+    if inv is not None:
+        return inv, None
+    inv, error = _scan_file(filepath, approx)
+    if error is None:
+        _store_cached(filepath, st, approx, inv)
+    return inv, error
+
+
+def _prune_cache(files):
+    """Delete cache entries that do not belong to any of files."""
+    keep = {os.path.basename(_cache_path(filepath, approx))
+            for filepath in files for approx in (False, True)}
+    try:
+        with os.scandir(_CACHE_DIR) as it:
+            stale = [e.path for e in it if e.name.endswith('.pkl') and e.name not in keep]
+    except FileNotFoundError:
+        return
+    for path in stale:
         try:
-            with open(filepath, 'r') as f:
-                for line in f:
-                    if not line.strip():
-                        continue
-                    msg = json.loads(line)
-                    all_messages.append(msg)
-        except Exception as e:
-            print(f"Warning: Failed to read {filepath}: {e}")
-
-    print(f"Total messages collected: {len(all_messages)}\n")
-
-    # Group by payload length
-    by_length = defaultdict(list)
-    for msg in all_messages:
-        length = msg['payload_length']
-        by_length[length].append(msg)
-
-    print("=" * 80)
-    print("MESSAGE LENGTH DISTRIBUTION")
-    print("=" * 80)
-    for length in sorted(by_length.keys()):
-        count = len(by_length[length])
-        print(f"  {length:3d} bytes: {count:4d} messages")
-
-    print("\n" + "=" * 80)
-    print("ANALYZING EACH MESSAGE LENGTH")
-    print("=" * 80)
-
-    for length in sorted(by_length.keys()):
-        messages = by_length[length]
-        print(f"\n--- {length} BYTE MESSAGES ({len(messages)} total) ---")
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Inventory captured device messages by length and payload pattern.")
+    parser.add_argument(
+        '--approx', action='store_true',
+        help=f"once a message length above {_APPROX_MIN_LENGTH} bytes (except 77) has "
+             f"more than {_APPROX_EXACT_LIMIT} unique patterns, estimate them with a "
+             "Bloom filter instead of counting them exactly")
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help=f"rescan every capture file instead of reusing results cached in {_CACHE_DIR}/")
+    args = parser.parse_args(argv)
+
+    files = _capture_files(_MESSAGES_DIR)
+    print(f"Analyzing {len(files)} capture files...\n")
+
+    # Files are independent, so ingest them in parallel and merge the
+    # partial aggregates in file order.
+    inventory = _Inventory(args.approx)
+    with ProcessPoolExecutor() as ex:
+        results = ex.map(_ingest_file, files, repeat(args.approx),
+                         repeat(not args.no_cache), chunksize=8)
+        for filepath, (partial, error) in zip(files, results):
+            if error is not None:
+                print(f"Warning: Failed to read {filepath}: {error}")
+            inventory.merge(partial)
+    if not args.no_cache:
+        # Drop entries for deleted or rotated captures
+        _prune_cache(files)
+
+    patterns_by_length = inventory.patterns_by_length
+    envelope_by_length = inventory.envelope_by_length
+    envelope_first_payload = inventory.envelope_first_payload
+
+    # Per-length totals fall out of the pattern counts; no message is
+    # kept around just to be counted again.
+    length_counts = {length: sum(patterns.values())
+                     for length, patterns in patterns_by_length.items()}
+    length_counts.update(inventory.approx_counts)
+    total_messages = sum(length_counts.values())
+    sorted_lengths = sorted(length_counts)
+
+    # The report is collected in memory and written with one call at the
+    # end instead of hundreds of individual prints.
+    out = []
+    out.append(f"Total messages collected: {total_messages}\n")
+
+    out.append(_BANNER)
+    out.append("MESSAGE LENGTH DISTRIBUTION")
+    out.append(_BANNER)
+    for length in sorted_lengths:
+        count = length_counts[length]
+        out.append(f"  {length:3d} bytes: {count:4d} messages")
+
+    out.append("\n" + _BANNER)
+    out.append("ANALYZING EACH MESSAGE LENGTH")
+    out.append(_BANNER)
+
+    for length in sorted_lengths:
+        out.append(f"\n--- {length} BYTE MESSAGES ({length_counts[length]} total) ---")
+
+        if length in inventory.approx_patterns:
+            estimate = inventory.approx_patterns[length].estimate_count()
+            out.append(f"Unique patterns: ~{estimate} (estimated, --approx)")
+            out.append(f"First byte distribution:")
+            for byte_val, count in inventory.approx_first_bytes[length].most_common():
+                out.append(f"  0x{byte_val:02x}: {count} messages")
+            out.append("\nPatterns not retained in --approx mode")
+            continue
 
         # Get unique hex patterns
-        hex_patterns = Counter([msg['payload_hex'] for msg in messages])
+        hex_patterns = patterns_by_length[length]
         unique_count = len(hex_patterns)
 
-        print(f"Unique patterns: {unique_count}")
+        out.append(f"Unique patterns: {unique_count}")
 
-        # Show first byte (message type)
+        # Show first byte (message type). Built from the unique patterns
+        # rather than per message, so the ingest loop does no extra work.
         first_bytes = Counter()
-        for msg in messages:
-            hex_data = msg['payload_hex']
-            if len(hex_data) >= 2:
-                first_byte = hex_data[0:2]
-                first_bytes[first_byte] += 1
-
-        print(f"First byte distribution:")
+        for pattern, count in hex_patterns.items():
+            if pattern:
+                first_bytes[pattern[0]] += count
+        out.append(f"First byte distribution:")
         for byte_val, count in first_bytes.most_common():
-            print(f"  0x{byte_val}: {count} messages")
+            out.append(f"  0x{byte_val:02x}: {count} messages")
 
         # Show most common patterns (up to 5)
         if unique_count <= 10:
-            print(f"\nAll unique hex patterns:")
-            for idx, (hex_pattern, count) in enumerate(hex_patterns.most_common(), 1):
-                print(f"  Pattern {idx} ({count} occurrences):")
-                print(f"    {hex_pattern}")
+            out.append(f"\nAll unique hex patterns:")
+            for idx, (pattern, count) in enumerate(hex_patterns.most_common(), 1):
+                out.append(f"  Pattern {idx} ({count} occurrences):")
+                out.append(f"    {pattern.hex()}")
                 # Try to identify message type
-                if len(hex_pattern) >= 2:
-                    first_byte = int(hex_pattern[0:2], 16)
-                    print(f"    First byte: 0x{first_byte:02x}")
+                if pattern:
+                    out.append(f"    First byte: 0x{pattern[0]:02x}")
         else:
-            print(f"\nTop 5 most common patterns:")
-            for idx, (hex_pattern, count) in enumerate(hex_patterns.most_common(5), 1):
-                print(f"  Pattern {idx} ({count} occurrences):")
-                print(f"    {hex_pattern[:80]}{'...' if len(hex_pattern) > 80 else ''}")
+            out.append(f"\nTop 5 most common patterns:")
+            for idx, (pattern, count) in enumerate(hex_patterns.most_common(5), 1):
+                hex_pattern = pattern.hex()
+                out.append(f"  Pattern {idx} ({count} occurrences):")
+                out.append(f"    {hex_pattern[:80]}{'...' if len(hex_pattern) > 80 else ''}")
 
-    print("\n" + "=" * 80)
-    print("SPECIAL INTEREST: 77-BYTE MESSAGES")
-    print("=" * 80)
+    out.append("\n" + _BANNER)
+    out.append("SPECIAL INTEREST: 77-BYTE MESSAGES")
+    out.append(_BANNER)
 
-    if 77 in by_length:
-        msgs_77 = by_length[77]
-        print(f"\nFound {len(msgs_77)} messages of 77 bytes")
+    if 77 in length_counts:
+        out.append(f"\nFound {length_counts[77]} messages of 77 bytes")
 
         # Check if they're all identical
-        hex_patterns_77 = set([msg['payload_hex'] for msg in msgs_77])
-        print(f"Unique patterns: {len(hex_patterns_77)}")
+        hex_patterns_77 = patterns_by_length[77]
+        out.append(f"Unique patterns: {len(hex_patterns_77)}")
 
         if len(hex_patterns_77) == 1:
-            print("\n✓ All 77-byte messages are IDENTICAL")
-            print("\nHex:")
-            print(f"  {list(hex_patterns_77)[0]}")
+            out.append("\n✓ All 77-byte messages are IDENTICAL")
+            out.append("\nHex:")
+            out.append(f"  {next(iter(hex_patterns_77)).hex()}")
 
             # Check message numbers
-            msg_nums = [msg['message_num'] for msg in msgs_77]
-            print(f"\nMessage numbers: {msg_nums}")
-            if all(n == 1 for n in msg_nums):
-                print("✓ All are message #1 (first message of connection)")
+            msg_nums_77 = inventory.msg_nums_77
+            if len(msg_nums_77) < length_counts[77]:
+                out.append(f"\nMessage numbers (first {len(msg_nums_77)} of "
+                           f"{length_counts[77]}): {msg_nums_77}")
+            else:
+                out.append(f"\nMessage numbers: {msg_nums_77}")
+            if inventory.all_first_77:
+                out.append("✓ All are message #1 (first message of connection)")
         else:
-            print(f"\n✗ Found {len(hex_patterns_77)} different 77-byte patterns")
+            out.append(f"\n✗ Found {len(hex_patterns_77)} different 77-byte patterns")
             for idx, pattern in enumerate(hex_patterns_77, 1):
-                print(f"\nPattern {idx}:")
-                print(f"  {pattern}")
-
-    print("\n" + "=" * 80)
-    print("ENVELOPE MESSAGES (TYPE 0x01)")
-    print("=" * 80)
-
-    # Find messages starting with 7e03 (sync + version) followed by envelope type 0x01
-    envelope_messages = []
-    for msg in all_messages:
-        hex_data = msg['payload_hex']
-        # Check if starts with 7e03 and has 0x01 at payload offset 0 (byte 8)
-        if len(hex_data) >= 20:  # At least 10 bytes
-            if hex_data.startswith('7e03'):
-                # Payload starts at byte 8 (offset 16 in hex string)
-                payload_start = 16
-                if len(hex_data) > payload_start:
-                    msg_type = hex_data[payload_start:payload_start+2]
-                    if msg_type == '01':
-                        envelope_messages.append(msg)
-
-    print(f"\nFound {len(envelope_messages)} envelope messages (type 0x01)")
-
-    if envelope_messages:
-        # Group by length
-        env_by_length = defaultdict(list)
-        for msg in envelope_messages:
-            env_by_length[msg['payload_length']].append(msg)
-
-        print("\nEnvelope message lengths:")
-        for length in sorted(env_by_length.keys()):
-            print(f"  {length} bytes: {len(env_by_length[length])} messages")
+                out.append(f"\nPattern {idx}:")
+                out.append(f"  {pattern.hex()}")
+
+    out.append("\n" + _BANNER)
+    out.append("ENVELOPE MESSAGES (TYPE 0x01)")
+    out.append(_BANNER)
+
+    envelope_total = sum(envelope_by_length.values())
+    out.append(f"\nFound {envelope_total} envelope messages (type 0x01)")
+
+    if envelope_total:
+        env_sorted_lengths = sorted(envelope_by_length)
+        out.append("\nEnvelope message lengths:")
+        for length in env_sorted_lengths:
+            out.append(f"  {length} bytes: {envelope_by_length[length]} messages")
 
         # Show some examples
-        print("\nExample envelope messages:")
-        for length in sorted(env_by_length.keys())[:3]:
-            print(f"\n  {length}-byte envelope (first occurrence):")
-            msg = env_by_length[length][0]
-            hex_data = msg['payload_hex']
-            print(f"    Full: {hex_data}")
+        out.append("\nExample envelope messages:")
+        for length in env_sorted_lengths[:3]:
+            out.append(f"\n  {length}-byte envelope (first occurrence):")
+            payload = envelope_first_payload[length]
+            out.append(f"    Full: {payload.hex()}")
             # Show bytes 8-20 (payload offset 0-12)
-            if len(hex_data) >= 40:
-                print(f"    Payload bytes 0-12: {hex_data[16:40]}")
-                print(f"    Payload byte 10: 0x{hex_data[36:38]} (suspected nested message type)")
+            if len(payload) >= 20:
+                out.append(f"    Payload bytes 0-12: {payload[8:20].hex()}")
+                out.append(f"    Payload byte 10: 0x{payload[18]:02x} (suspected nested message type)")
+
+    sys.stdout.write('\n'.join(out) + '\n')
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,78 @@
+"""Regression checks for analyze_message_inventory. Run with: pytest tools/"""
+
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import analyze_message_inventory as inventory  # noqa: E402
+
+
+def _write_capture(path, payloads):
+    with open(path, 'w') as f:
+        for num, payload in enumerate(payloads, 1):
+            record = {"message_num": num, "payload_length": len(payload),
+                      "payload_hex": payload.hex()}
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+def _merge_files(paths, approx):
+    merged = inventory._Inventory(approx)
+    for path in paths:
+        partial, error = inventory._scan_file(path, approx)
+        assert error is None
+        merged.merge(partial)
+    return merged
+
+
+def test_approx_unique_count_survives_merging_many_large_files(tmp_path, monkeypatch):
+    # A small exact limit keeps filter layers small, so 30 files of 2000
+    # distinct payloads hold far more keys than one layer is sized for;
+    # OR-ing them all into that layer used to saturate it.
+    monkeypatch.setattr(inventory, '_APPROX_EXACT_LIMIT', 256)
+    rng = random.Random(1)
+    paths = []
+    for i in range(30):
+        path = tmp_path / f"capture-{i:02d}.jsonl"
+        _write_capture(path, [rng.getrandbits(800).to_bytes(100, 'little')
+                              for _ in range(2000)])
+        paths.append(path)
+
+    merged = _merge_files(paths, approx=True)
+
+    assert merged.approx_counts[100] == 60000
+    estimate = merged.approx_patterns[100].estimate_count()
+    assert abs(estimate - 60000) / 60000 < 0.03
+
+
+def test_approx_unique_count_matches_exact_with_shared_patterns(tmp_path):
+    # Files of different sizes draw from one pool, so patterns repeat across
+    # files and some buckets stay exact while others become filters.
+    rng = random.Random(2)
+    pool = [rng.getrandbits(800).to_bytes(100, 'little') for _ in range(30000)]
+    paths = []
+    for i, count in enumerate([1000, 3000, 9000, 15000, 500, 12000]):
+        path = tmp_path / f"capture-{i:02d}.jsonl"
+        _write_capture(path, [rng.choice(pool) for _ in range(count)])
+        paths.append(path)
+
+    exact = len(_merge_files(paths, approx=False).patterns_by_length[100])
+    merged = _merge_files(paths, approx=True)
+
+    estimate = merged.approx_patterns[100].estimate_count()
+    assert abs(estimate - exact) / exact < 0.03
+
+
+def test_record_regex_does_not_span_lines(tmp_path):
+    # A record split over two lines must not be joined by the fast path;
+    # both halves fall through to the JSON parser, which rejects them.
+    path = tmp_path / "capture-split.jsonl"
+    path.write_bytes(b'{"message_num":1,"payload_length":3,\n'
+                     b'"payload_hex":"aabbcc"}\n')
+
+    assert inventory._RECORD_RE.search(path.read_bytes()) is None
+    assert inventory._MSG_NUM_RE.search(b'"message_num":\n1') is None
+    _, error = inventory._scan_file(path)
+    assert error is not None